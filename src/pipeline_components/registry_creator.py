@@ -1,16 +1,41 @@
 import geopandas as gpd
+from geopandas.io.arrow import _geopandas_to_arrow
+import os
 from pathlib import Path
 import numpy as np
 import pandas as pd
-from shapely import wkt
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
 from shapely.geometry import Point
-from scipy.spatial import cKDTree
-import geopy.distance
+from pyproj import Geod, Transformer
 import geocoder
+import requests
+import threading
 import time
-import math
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple
 
+# Reference ellipsoid for geodesic distance calculations between lat, lon coordinates
+WGS84_GEOD = Geod(ellps="WGS84")
+
+# Projection from lat, lon coordinates to EPSG:5243, which is used to calculate areas in square meters
+WGS84_TO_EPSG5243 = Transformer.from_crs(4326, 5243, always_xy=True)
+
+# Upper bound on the request rate and the number of concurrent requests sent to Bing's geocoding service
+BING_GEOCODING_REQUESTS_PER_SECOND = 50
+BING_GEOCODING_MAX_WORKERS = 8
+
+# OSM's public Nominatim service allows at most one request per second, sent from a single client at a time
+OSM_GEOCODING_REQUESTS_PER_SECOND = 1
+OSM_GEOCODING_MAX_WORKERS = 1
+
+# Geometry types which are kept when overlaying PV polygons with rooftop polygons
+POLYGONAL_GEOMETRY_TYPES = [
+    shapely.GeometryType.POLYGON,
+    shapely.GeometryType.MULTIPOLYGON,
+]
+
 
 class RawSolarDatabase:
     def from_csv(self, file_path: Path):
@@ -36,12 +61,91 @@ class RawSolarDatabase:
             header=None,
             names=["Current_Tile_240", "UL_Image_16", "geometry"],
         )
-        solar_db["geometry"] = solar_db["geometry"].apply(wkt.loads)
+        # Parse all WKT strings in one vectorized call instead of one wkt.loads call per row
+        solar_db["geometry"] = shapely.from_wkt(solar_db["geometry"].to_numpy())
         solar_db = gpd.GeoDataFrame(solar_db, geometry="geometry")
         solar_db.crs = {"init": "epsg:4326"}
         solar_db["class"] = int(1)
         return solar_db[["class", "geometry"]]
 
+    def from_parquet(self, file_path: Path):
+        """
+        Load raw PV polygons from a GeoParquet file which has been created from the csv file of the previous pipeline
+        step. Geometries are stored as WKB and are read without any text parsing.
+
+        Parameters
+        ----------
+        file_path: Path
+            Path to the GeoParquet file where all detected PV polygons from the tile processing step are stored.
+
+        Returns
+        -------
+        GeoPandas.GeoDataFrame
+            GeoPandas.GeoDataFrame specifying all raw PV polygons detected during the previous pipeline step within a
+            given county.
+        """
+
+        solar_db = gpd.read_parquet(file_path)
+        return solar_db[["class", "geometry"]]
+
+    def load(self, file_path: Path):
+        """
+        Load raw PV polygons detected during the previous pipeline step. The csv file written by the tile processing
+        step is converted to a GeoParquet file next to it once, subsequent runs read the GeoParquet file instead. The
+        modification time and size of the csv file are stored in the GeoParquet file's metadata, the GeoParquet file is
+        recreated whenever either of them has changed in the meantime or if it cannot be read.
+
+        Parameters
+        ----------
+        file_path: Path
+            Path to the csv file where all detected PV polygons from the tile processing step are stored.
+
+        Returns
+        -------
+        GeoPandas.GeoDataFrame
+            GeoPandas.GeoDataFrame specifying all raw PV polygons detected during the previous pipeline step within a
+            given county.
+        """
+
+        parquet_path = file_path.with_suffix(".parquet")
+
+        # Comparing the size as well detects rows appended by the tile processing step within the timestamp resolution
+        # of the file system. The csv file's state is recorded before reading it, so rows appended while reading it
+        # lead to a recreation of the GeoParquet file in the next run
+        csv_stat = file_path.stat()
+        csv_metadata = {
+            b"csv_mtime_ns": str(csv_stat.st_mtime_ns).encode(),
+            b"csv_size": str(csv_stat.st_size).encode(),
+        }
+
+        if parquet_path.exists():
+            try:
+                parquet_metadata = pq.read_schema(parquet_path).metadata or {}
+                if all(
+                    parquet_metadata.get(key) == value
+                    for key, value in csv_metadata.items()
+                ):
+                    return self.from_parquet(parquet_path)
+
+            # A damaged GeoParquet file is recreated from the csv file
+            except (OSError, pa.ArrowInvalid) as error:
+                print(f"Recreate unreadable GeoParquet file {parquet_path}: {error}")
+
+        solar_db = self.from_csv(file_path)
+
+        # Build the Arrow table the same way GeoDataFrame.to_parquet does and add the csv file's state to the GeoParquet
+        # metadata, so that the file is written only once
+        solar_table = _geopandas_to_arrow(solar_db)
+        solar_table = solar_table.replace_schema_metadata(
+            {**solar_table.schema.metadata, **csv_metadata}
+        )
+
+        # Write to a temporary file first, so that an interrupted write never leaves a truncated GeoParquet file behind
+        temporary_parquet_path = parquet_path.with_name(parquet_path.name + ".tmp")
+        pq.write_table(solar_table, temporary_parquet_path, compression="snappy")
+        os.replace(temporary_parquet_path, parquet_path)
+        return solar_db
+
 
 class RegistryCreator:
     """
@@ -56,6 +160,8 @@ class RegistryCreator:
         Contains all the identified and segmented PV panels within a given county based on the results from the previous tile processing step.
     rooftop_gdf: GeoPandas.GeoDataFrame
         Contains all the rooftop information such as a rooftop's tilt, its azimuth, and its geo-referenced polygon derived from openNRW's 3D building data.
+    rooftop_tree: shapely.STRtree
+        Spatial index on the validated rooftop polygons of rooftop_gdf, which is built once and shared by all overlay operations.
     bing_key: str
         Your Bing API key which is needed to reverse geocode lat, lon values into actual street addresses.
     corrected_PV_installations_on_rooftop: GeoPandas.GeoDataFrame
@@ -71,7 +177,7 @@ class RegistryCreator:
         """
 
         self.county = configuration.get("county4analysis")
-        self.raw_PV_polygons_gdf = RawSolarDatabase().from_csv(
+        self.raw_PV_polygons_gdf = RawSolarDatabase().load(
             Path(f"data/pv_database/{self.county}_PV_db.csv")
         )
 
@@ -80,14 +186,21 @@ class RegistryCreator:
         )
         self.rooftop_gdf.crs = {"init": "epsg:4326"}
 
+        self.rooftop_tree = shapely.STRtree(
+            shapely.make_valid(self.rooftop_gdf.geometry.to_numpy())
+        )
+
         self.bing_key = configuration["bing_key"]
 
         self.corrected_PV_installations_on_rooftop = self.preprocess_raw_pv_polygons(
-            self.raw_PV_polygons_gdf, self.rooftop_gdf
+            self.raw_PV_polygons_gdf, self.rooftop_gdf, self.rooftop_tree
         )
 
     def preprocess_raw_pv_polygons(
-        self, raw_PV_polygons_gdf: gpd.GeoDataFrame, rooftop_gdf: gpd.GeoDataFrame
+        self,
+        raw_PV_polygons_gdf: gpd.GeoDataFrame,
+        rooftop_gdf: gpd.GeoDataFrame,
+        rooftop_tree: shapely.STRtree = None,
     ) -> gpd.GeoDataFrame:
         """
         Preprocessing the raw PV polygons detected during the previous pipeline step.
@@ -98,6 +211,8 @@ class RegistryCreator:
             GeoPandas.GeoDataFrame consisting of all detected PV polygons from the previous pipeline step.
         rooftop_gdf: GeoPandas.GeoDataFrame
             GeoPandas.GeoDataFrame specifying all rooftop geometries and attributes within the given county
+        rooftop_tree: shapely.STRtree
+            Spatial index on the validated rooftop geometries of rooftop_gdf. It is built from rooftop_gdf if not given.
 
         Returns
         -------
@@ -114,7 +229,7 @@ class RegistryCreator:
             raw_PV_installations_on_rooftop,
             raw_PV_installations_off_rooftop,
         ] = self.overlay_raw_PV_installations_and_rooftops(
-            raw_PV_installations_gdf, rooftop_gdf
+            raw_PV_installations_gdf, rooftop_gdf, rooftop_tree
         )
 
         raw_overhanging_PV_installations = (
@@ -137,15 +252,17 @@ class RegistryCreator:
             )
         )
 
-        # Create street address column
+        # Create street address column. Addresses with a missing component remain missing
         raw_PV_installations_on_rooftop["Street_Address"] = (
             raw_PV_installations_on_rooftop["Street"]
-            + " "
-            + raw_PV_installations_on_rooftop["StreetNumb"]
-            + ", "
-            + raw_PV_installations_on_rooftop["PostalCode"]
-            + ", "
-            + raw_PV_installations_on_rooftop["City"]
+            .str.cat(raw_PV_installations_on_rooftop["StreetNumb"], sep=" ")
+            .str.cat(
+                [
+                    raw_PV_installations_on_rooftop["PostalCode"],
+                    raw_PV_installations_on_rooftop["City"],
+                ],
+                sep=", ",
+            )
         )
 
         raw_PV_installations_on_rooftop = self.remove_erroneous_pv_polygons(
@@ -158,6 +275,30 @@ class RegistryCreator:
 
         return corrected_PV_installations_on_rooftop
 
+    def _calculate_area_in_sqm(self, geometries: np.ndarray = None) -> np.ndarray:
+        """
+        Calculates the area of geometries given in EPSG:4326 in square meters by projecting them to EPSG:5243.
+
+        Parameters
+        ----------
+        geometries: numpy.ndarray
+            Array of shapely geometries with coordinates in EPSG:4326
+        Returns
+        -------
+        numpy.ndarray
+            Area of each geometry in square meters
+        """
+
+        # All coordinates are transformed in a single call to the transformer which is shared by all area calculations
+        projected_geometries = shapely.transform(
+            geometries,
+            lambda coords: np.column_stack(
+                WGS84_TO_EPSG5243.transform(coords[:, 0], coords[:, 1])
+            ),
+        )
+
+        return shapely.area(projected_geometries)
+
     def aggregate_raw_PV_polygons_to_raw_PV_installations(
         self, raw_PV_polygons_gdf: gpd.GeoDataFrame
     ) -> gpd.GeoDataFrame:
@@ -175,27 +316,31 @@ class RegistryCreator:
            GeoDataFrame with dissolved PV polygon geometries.
         """
 
-        # Buffer polygons, i.e. overwrite the original polygons with their buffered versions
+        # Buffer polygons to close the small gaps between PV polygons of the same installation
         # Based on our experience, the buffer value should be within [1e-6, 1e-8] degrees
-        raw_PV_polygons_gdf["geometry"] = raw_PV_polygons_gdf["geometry"].buffer(1e-6)
+        buffered_PV_polygons = shapely.buffer(
+            raw_PV_polygons_gdf.geometry.to_numpy(), 1e-6, quad_segs=16
+        )
 
-        # Dissolve, i.e. aggregate, all PV polygons into one Multipolygon
-        raw_PV_polygons_gdf = raw_PV_polygons_gdf.dissolve(by="class")
+        # Aggregate all PV polygons into one Multipolygon. All raw PV polygons share the same class, so a single
+        # union over the geometry array replaces the dissolve by "class"
+        aggregated_PV_polygons = shapely.unary_union(buffered_PV_polygons)
 
-        # Explode multi-part geometries into multiple single geometries
-        raw_PV_installations_gdf = (
-            raw_PV_polygons_gdf.explode().reset_index().drop(columns=["level_1"])
+        # Explode the multi-part geometry into multiple single geometries
+        raw_PV_installations_gdf = gpd.GeoDataFrame(
+            geometry=shapely.get_parts(aggregated_PV_polygons),
+            crs=raw_PV_polygons_gdf.crs,
         )
 
         # Compute the raw area for each pv installation
-        raw_PV_installations_gdf["raw_area"] = (
-            raw_PV_installations_gdf["geometry"].to_crs(epsg=5243).area
+        raw_PV_installations_gdf["raw_area"] = self._calculate_area_in_sqm(
+            raw_PV_installations_gdf.geometry.to_numpy()
         )
 
         # Create a unique identifier for each pv installation
-        raw_PV_installations_gdf["identifier"] = raw_PV_installations_gdf.index.map(
-            lambda id: "polygon_" + str(id)
-        )
+        raw_PV_installations_gdf[
+            "identifier"
+        ] = "polygon_" + raw_PV_installations_gdf.index.astype(str)
 
         return raw_PV_installations_gdf
 
@@ -203,6 +348,7 @@ class RegistryCreator:
         self,
         raw_PV_installations_gdf: gpd.GeoDataFrame = None,
         rooftop_gdf: gpd.GeoDataFrame = None,
+        rooftop_tree: shapely.STRtree = None,
     ) -> List[gpd.GeoDataFrame]:
         """
         Overlay PV polygon geometries with rooftop geometries.
@@ -213,6 +359,8 @@ class RegistryCreator:
             GeoDataFrame with dissolved PV polygon geometries.
         rooftop_gdf : GeoPandas.GeoDataFrame
             GeoDataFrame specifying all rooftop geometries in a given county.
+        rooftop_tree : shapely.STRtree
+            Spatial index on the validated rooftop geometries of rooftop_gdf. It is built from rooftop_gdf if not given.
         Returns
         -------
         List[GeoPandas.GeoDataFrame]
@@ -220,124 +368,207 @@ class RegistryCreator:
             specifies PV polygons which do not intersect with rooftop geometries
         """
 
+        pv_geometries = shapely.make_valid(raw_PV_installations_gdf.geometry.to_numpy())
+
+        if rooftop_tree is None:
+            rooftop_tree = shapely.STRtree(
+                shapely.make_valid(rooftop_gdf.geometry.to_numpy())
+            )
+        rooftop_geometries = rooftop_tree.geometries
+
+        # Query all pairs of intersecting PV and rooftop geometries from the spatial index on the rooftops
+        pv_idx, rooftop_idx = rooftop_tree.query(pv_geometries, predicate="intersects")
+        pair_order = np.lexsort((rooftop_idx, pv_idx))
+        pv_idx, rooftop_idx = pv_idx[pair_order], rooftop_idx[pair_order]
+
         # Intersect PV panels and rooftop polygons to enrich all the PV polygons with the attributes of their respective rooftop polygon
-        raw_PV_installations_on_rooftop = gpd.overlay(
-            raw_PV_installations_gdf, rooftop_gdf, how="intersection"
+        intersections = self._extract_polygonal_parts(
+            shapely.intersection(pv_geometries[pv_idx], rooftop_geometries[rooftop_idx])
         )
 
-        raw_PV_installations_on_rooftop["area_inter"] = (
-            raw_PV_installations_on_rooftop["geometry"].to_crs(epsg=5243).area
+        # Pairs which only touch each other yield lines or points and are dropped
+        is_intersection_polygonal = np.isin(
+            shapely.get_type_id(intersections), POLYGONAL_GEOMETRY_TYPES
         )
 
+        raw_PV_installations_on_rooftop = (
+            raw_PV_installations_gdf.drop(
+                columns=raw_PV_installations_gdf.geometry.name
+            )
+            .iloc[pv_idx]
+            .reset_index(drop=True)
+            .join(
+                rooftop_gdf.drop(columns=rooftop_gdf.geometry.name)
+                .iloc[rooftop_idx]
+                .reset_index(drop=True),
+                lsuffix="_1",
+                rsuffix="_2",
+            )
+        )
+        raw_PV_installations_on_rooftop = gpd.GeoDataFrame(
+            raw_PV_installations_on_rooftop[is_intersection_polygonal],
+            geometry=intersections[is_intersection_polygonal],
+            crs=raw_PV_installations_gdf.crs,
+        ).reset_index(drop=True)
+
         # PV polygons which are not on rooftops. This includes free-standing PV units and geometries overhanging from rooftops
-        raw_PV_installations_off_rooftop = gpd.overlay(
-            raw_PV_installations_gdf, rooftop_gdf, how="difference"
+        # Each PV polygon is differenced with the union of all rooftops it intersects
+        intersected_pv_idx, group_starts = np.unique(pv_idx, return_index=True)
+        group_ends = np.append(group_starts[1:], len(rooftop_idx))
+        intersected_rooftop_unions = [
+            shapely.union_all(rooftop_geometries[rooftop_idx[start:end]])
+            for start, end in zip(group_starts, group_ends)
+        ]
+
+        differences = pv_geometries.copy()
+        differences[intersected_pv_idx] = shapely.difference(
+            pv_geometries[intersected_pv_idx], intersected_rooftop_unions
         )
+        differences = self._extract_polygonal_parts(differences)
+
+        # PV polygons which are entirely covered by rooftops are dropped
+        is_difference_polygonal = np.isin(
+            shapely.get_type_id(differences), POLYGONAL_GEOMETRY_TYPES
+        ) & ~shapely.is_empty(differences)
+
+        raw_PV_installations_off_rooftop = gpd.GeoDataFrame(
+            raw_PV_installations_gdf.drop(
+                columns=raw_PV_installations_gdf.geometry.name
+            )[is_difference_polygonal],
+            geometry=differences[is_difference_polygonal],
+            crs=raw_PV_installations_gdf.crs,
+        ).reset_index(drop=True)
 
-        raw_PV_installations_off_rooftop["area_diff"] = (
-            raw_PV_installations_off_rooftop["geometry"].to_crs(epsg=5243).area
+        # Reproject the geometries of both overlays in a single pass to compute their areas in sqm
+        overlay_areas = self._calculate_area_in_sqm(
+            np.concatenate(
+                [
+                    raw_PV_installations_on_rooftop.geometry.to_numpy(),
+                    raw_PV_installations_off_rooftop.geometry.to_numpy(),
+                ]
+            )
         )
 
+        raw_PV_installations_on_rooftop["area_inter"] = overlay_areas[
+            : len(raw_PV_installations_on_rooftop)
+        ]
+        raw_PV_installations_off_rooftop["area_diff"] = overlay_areas[
+            len(raw_PV_installations_on_rooftop) :
+        ]
+
         return [raw_PV_installations_on_rooftop, raw_PV_installations_off_rooftop]
 
-    def _ckdnearest(
-        self, gdA: gpd.GeoDataFrame = None, gdB: gpd.GeoDataFrame = None
-    ) -> gpd.GeoDataFrame:
+    def _extract_polygonal_parts(self, geometries: np.ndarray = None) -> np.ndarray:
         """
-        Identifies the nearest points of GeoPandas.DataFrame gdB in GeoPandas.DataFrame gdA. Indices need to be resorted before using this function.
+        Reduces GeometryCollections resulting from an overlay to the union of their polygonal parts, analogous to
+        GeoPandas.overlay with keep_geom_type=True.
 
         Parameters
         ----------
-        gdA : GeoPandas.GeoDataFrame
-            GeoDataFrame which contains a column specifying shapely.geometry.Point objects for the centroids of the
-            overhanging PV polygons
-        gdB : GeoPandas.GeoDataFrame
-            GeoDataFrame which contains a column specifying shapely.geometry.Point objects for the centroids of the
-            intersected PV polygons
+        geometries: numpy.ndarray
+            Array of shapely geometries resulting from an intersection or difference operation
         Returns
         -------
-        GeoPandas.GeoDataFrame
-            Concatenated GeoPandas.GeoDataFrame containing all columns of both GeoDataFrames excluding gdB's
-            geometry, i.e. the centroid of the intersected PV polygons, plus distance in degrees.
+        numpy.ndarray
+            Input array where every GeometryCollection has been replaced by the union of its polygonal parts
         """
 
-        # List specifying the centroid coordinates of the overhanging PV polygons
-        nA = np.array(list(zip(gdA.geometry.x, gdA.geometry.y)))
+        geometries = geometries.copy()
 
-        # List specifying the centroid coordinates of the intersected PV polygons
-        nB = np.array(list(zip(gdB.geometry.x, gdB.geometry.y)))
+        is_collection = (
+            shapely.get_type_id(geometries) == shapely.GeometryType.GEOMETRYCOLLECTION
+        )
 
-        btree = cKDTree(nB)
+        geometries[is_collection] = [
+            shapely.union_all(
+                parts[np.isin(shapely.get_type_id(parts), POLYGONAL_GEOMETRY_TYPES)]
+            )
+            for parts in map(shapely.get_parts, geometries[is_collection])
+        ]
 
-        # idx lists the index of the nearest neighbor in nB for each centroid in nA
-        # dist specifies the respective distance between the nearest neighbors in degrees
-        dist, idx = btree.query(nA, k=1)
+        return geometries
 
-        gdf = pd.concat(
-            [
-                gdA.reset_index(drop=True),
-                gdB.loc[idx, gdB.columns != "geometry"].reset_index(drop=True),
-                pd.Series(dist, name="dist_in_degrees"),
-            ],
-            axis=1,
+    def _query_nearest_centroids(
+        self, centroids_A: np.ndarray = None, centroids_B: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Identifies the nearest point of centroids_B for each point in centroids_A.
+
+        Parameters
+        ----------
+        centroids_A : numpy.ndarray
+            Array of shapely.geometry.Point objects specifying the centroids of the overhanging PV polygons
+        centroids_B : numpy.ndarray
+            Array of shapely.geometry.Point objects specifying the centroids of the intersected PV polygons
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            Positions of the centroids in centroids_A, positions of their nearest neighbor in centroids_B, and the
+            respective distance between the nearest neighbors in degrees
+        """
+
+        # Nearest neighbor search on a spatial index of centroids_B. Only the first of several equidistant neighbors
+        # is returned
+        (idx_A, idx_B), dist = shapely.STRtree(centroids_B).query_nearest(
+            centroids_A, return_distance=True, all_matches=False
         )
 
-        # GeoDataFrame adding all the attributes of the nearest intersected PV polygon to the overhanging PV polygons
-        return gpd.GeoDataFrame(gdf)
+        return idx_A, idx_B, dist
 
     def calculate_distance_in_meters_between_raw_overhanging_pv_installation_centroid_and_nearest_intersected_installation_centroid(
         self,
-        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data: gpd.GeoDataFrame = None,
-    ):
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data: pd.DataFrame = None,
+    ) -> pd.DataFrame:
         """
         Calculate the distance in meters between the centroid of the overhanging PV polygon, here points_no_data,
         and the PV polygon centroid which is intersected with a rooftop polygon, here address_points
 
         Parameters
         ----------
-        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data: GeoPandas.GeoDataFrame
-            GeoDataFrame where overhanging PV installations have been enriched with the attributes of the closest
-            rooftop
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data: Pandas.DataFrame
+            DataFrame where overhanging PV installations have been enriched with the attributes of the closest
+            rooftop. The columns "helper_x", "helper_y", "helper_x_diff", and "helper_y_diff" specify the centroid
+            coordinates of the intersected and the overhanging PV polygon, respectively
 
         Returns
         -------
-        GeoPandas.GeoDataFrame
-            GeoDataFrame where overhanging PV installations have been enriched with the attributes of the closest
+        Pandas.DataFrame
+            DataFrame where overhanging PV installations have been enriched with the attributes of the closest
             rooftop with an additional attribute which specifies the distance between the centroid of the overhanging PV polygon and the centroid of the intersected PV polygon in meters
         """
 
-        # Centroid coordinates of intersected pv polygons
-        address_points = list(
-            zip(
-                raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
-                    "centroid_intersect"
-                ].x,
-                raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
-                    "centroid_intersect"
-                ].y,
-            )
+        # Cached centroid coordinates of intersected pv polygons
+        address_points_x = (
+            raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+                "helper_x"
+            ].to_numpy(dtype=np.float64)
+        )
+        address_points_y = (
+            raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+                "helper_y"
+            ].to_numpy(dtype=np.float64)
         )
 
-        # Centroid coordinates of overhanging pv polygons
-        points_no_data = list(
-            zip(
-                raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
-                    "geometry"
-                ].x,
-                raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
-                    "geometry"
-                ].y,
-            )
+        # Cached centroid coordinates of overhanging pv polygons
+        points_no_data_x = (
+            raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+                "helper_x_diff"
+            ].to_numpy(dtype=np.float64)
+        )
+        points_no_data_y = (
+            raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+                "helper_y_diff"
+            ].to_numpy(dtype=np.float64)
         )
 
-        dist = [
-            geopy.distance.geodesic(address, no_data).m
-            for address, no_data in zip(address_points, points_no_data)
-        ]
+        # Geodesic distance on the WGS84 ellipsoid, computed for all pairs of centroids at once
+        _, _, dist = WGS84_GEOD.inv(
+            address_points_x, address_points_y, points_no_data_x, points_no_data_y
+        )
 
         raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
             "dist_in_meters"
-        ] = pd.Series(dist)
+        ] = dist
 
         return raw_overhanging_pv_installations_enriched_with_closest_rooftop_data
 
@@ -383,16 +614,6 @@ class RegistryCreator:
             ~raw_overhanging_PV_installations.identifier.isnull()
         ]
 
-        # Save the shape of the overhanging PV system polygon
-        raw_overhanging_PV_installations[
-            "geometry_overhanging_polygon"
-        ] = raw_overhanging_PV_installations["geometry"]
-
-        # Compute centroid of overhanging PV system polygons
-        raw_overhanging_PV_installations["geometry"] = raw_overhanging_PV_installations[
-            "geometry"
-        ].centroid
-
         return raw_overhanging_PV_installations
 
     def filter_raw_overhanging_PV_installations_by_area(
@@ -437,7 +658,7 @@ class RegistryCreator:
         self,
         raw_overhanging_PV_installations: gpd.GeoDataFrame = None,
         raw_PV_installations_on_rooftop: gpd.GeoDataFrame = None,
-    ) -> gpd.GeoDataFrame:
+    ) -> pd.DataFrame:
         """
         PV polygons which do not intersect with a rooftop polygon, although they do border to a rooftop, are matched to
         their nearest rooftop geometry
@@ -452,18 +673,62 @@ class RegistryCreator:
 
         Returns
         -------
-        GeoPandas.GeoDataFrame
-            GeoDataFrame where overhanging PV installations have been enriched with the attributes of the closest
-            rooftop
+        Pandas.DataFrame
+            DataFrame where overhanging PV installations have been enriched with the attributes of the closest
+            rooftop. The column "geometry" specifies the overhanging PV polygons as shapely objects
         """
 
-        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data = (
-            self._ckdnearest(
-                raw_overhanging_PV_installations,
-                raw_PV_installations_on_rooftop,
-            )
+        # Overhanging PV polygons are matched to the intersected PV polygon with the nearest centroid
+        overhanging_polygons = raw_overhanging_PV_installations.geometry.to_numpy()
+        overhanging_centroids = shapely.centroid(overhanging_polygons)
+        intersected_centroids = shapely.centroid(
+            raw_PV_installations_on_rooftop.geometry.to_numpy()
         )
 
+        (
+            overhanging_idx,
+            intersected_idx,
+            dist_in_degrees,
+        ) = self._query_nearest_centroids(overhanging_centroids, intersected_centroids)
+
+        # DataFrame adding all the attributes of the nearest intersected PV polygon to the overhanging PV polygons. The
+        # geometries are kept as a plain array of shapely objects
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data = pd.concat(
+            [
+                raw_overhanging_PV_installations.drop(
+                    columns=raw_overhanging_PV_installations.geometry.name
+                )
+                .iloc[overhanging_idx]
+                .reset_index(drop=True),
+                raw_PV_installations_on_rooftop.drop(
+                    columns=raw_PV_installations_on_rooftop.geometry.name
+                )
+                .iloc[intersected_idx]
+                .reset_index(drop=True),
+            ],
+            axis=1,
+        )
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+            "geometry"
+        ] = overhanging_polygons[overhanging_idx]
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+            "dist_in_degrees"
+        ] = dist_in_degrees
+
+        # Centroid coordinates of both PV polygons for the subsequent distance calculation
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+            "helper_x"
+        ] = shapely.get_x(intersected_centroids[intersected_idx])
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+            "helper_y"
+        ] = shapely.get_y(intersected_centroids[intersected_idx])
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+            "helper_x_diff"
+        ] = shapely.get_x(overhanging_centroids[overhanging_idx])
+        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data[
+            "helper_y_diff"
+        ] = shapely.get_y(overhanging_centroids[overhanging_idx])
+
         # Calculate the distance in meters between the centroid of the overhanging PV polygon and the centroid of the
         # PV polygon which is intersected with a rooftop polygon
         raw_overhanging_pv_installations_enriched_with_closest_rooftop_data = self.calculate_distance_in_meters_between_raw_overhanging_pv_installation_centroid_and_nearest_intersected_installation_centroid(
@@ -494,15 +759,11 @@ class RegistryCreator:
                     "StreetNumb",
                     "Tilt",
                     "area_inter",
-                    "geometry_overhanging_polygon",
+                    "geometry",
                 ]
             ]
         )
 
-        raw_overhanging_pv_installations_enriched_with_closest_rooftop_data.rename(
-            columns={"geometry_overhanging_polygon": "geometry"}, inplace=True
-        )
-
         return raw_overhanging_pv_installations_enriched_with_closest_rooftop_data
 
     def append_raw_overhanging_PV_installations_to_intersected_installations(
@@ -529,34 +790,14 @@ class RegistryCreator:
             rooftop and appended to raw_PV_installations_on_rooftop
         """
 
-        # IMPORTANT: if ckdnearest is used always reset_index before
-        raw_overhanging_PV_installations = raw_overhanging_PV_installations.reset_index(
-            drop=True
-        )
-
-        raw_overhanging_PV_installations.rename(
-            columns={"identifier": "identifier_diff"}, inplace=True
+        raw_overhanging_PV_installations = raw_overhanging_PV_installations.rename(
+            columns={"identifier": "identifier_diff"}
         )
 
-        # Extract centroid from intersected PV polygons while preserving their polygon geometry
-        raw_PV_installations_on_rooftop[
-            "geometry_intersected_polygon"
-        ] = raw_PV_installations_on_rooftop["geometry"]
-        raw_PV_installations_on_rooftop["geometry"] = raw_PV_installations_on_rooftop[
-            "geometry"
-        ].centroid
-        raw_PV_installations_on_rooftop[
-            "centroid_intersect"
-        ] = raw_PV_installations_on_rooftop["geometry"]
-
         raw_overhanging_pv_installations_enriched_with_closest_rooftop_data = self.enrich_raw_overhanging_pv_installations_with_closest_rooftop_attributes(
             raw_overhanging_PV_installations, raw_PV_installations_on_rooftop
         )
 
-        raw_PV_installations_on_rooftop.geometry = (
-            raw_PV_installations_on_rooftop.geometry_intersected_polygon
-        )
-
         raw_PV_installations_on_rooftop = raw_PV_installations_on_rooftop[
             [
                 "raw_area",
@@ -581,11 +822,19 @@ class RegistryCreator:
         # Note 1: Attributes starting with capital letters specify rooftop attributes.
         # Note 2: The geometry of the overhanging PV installations is not yet dissolved with the geometry of the
         # intersected PV installations
+        # Note 3: The overhanging PV installations are only promoted to a GeoDataFrame here, together with the
+        # intersected PV installations
         raw_PV_installations_on_rooftop = gpd.GeoDataFrame(
-            raw_PV_installations_on_rooftop.append(
-                raw_overhanging_pv_installations_enriched_with_closest_rooftop_data
-            )
-        ).reset_index(drop=True)
+            pd.concat(
+                [
+                    pd.DataFrame(raw_PV_installations_on_rooftop),
+                    raw_overhanging_pv_installations_enriched_with_closest_rooftop_data,
+                ],
+                ignore_index=True,
+            ),
+            geometry="geometry",
+            crs=raw_PV_installations_on_rooftop.crs,
+        )
 
         return raw_PV_installations_on_rooftop
 
@@ -611,25 +860,20 @@ class RegistryCreator:
             / raw_PV_installations_on_rooftop["raw_area"]
         )
 
-        # Group intersection by polygon identifier and sum percentage
-        group_intersection_id = raw_PV_installations_on_rooftop.groupby(
-            "identifier"
-        ).agg(
-            {
-                "area_inter": "sum",
-                "Street": "first",
-                "Street_Address": "first",
-                "raw_area": "first",
-                "City": "first",
-                "PostalCode": "first",
-                "percentage_intersect": "sum",
-            }
+        # Group intersection by polygon identifier and sum percentage in a single pass over the identifiers
+        identifiers, group_idx = np.unique(
+            raw_PV_installations_on_rooftop["identifier"].to_numpy(dtype=str),
+            return_inverse=True,
+        )
+        percentage_intersect_sum = np.bincount(
+            group_idx,
+            weights=raw_PV_installations_on_rooftop["percentage_intersect"].to_numpy(
+                dtype=np.float64
+            ),
         )
 
         # Find erroneous polygons whose area after intersection is larger than their original (raw) area
-        polygone = group_intersection_id[
-            group_intersection_id["percentage_intersect"] > 1.1
-        ].index.tolist()
+        polygone = identifiers[percentage_intersect_sum > 1.1]
 
         # Filter out erroneous polygons identified above and all their respective sub-parts
         raw_PV_installations_on_rooftop = raw_PV_installations_on_rooftop.drop(
@@ -671,12 +915,10 @@ class RegistryCreator:
         # standard tilt of 32 degrees
         # 2. PV panels are tilted in the same way as their underlying rooftop. On flat roofs, we assume a tilt angle
         # of 32 degrees
-        raw_PV_installations_on_rooftop["Tilt"][
-            raw_PV_installations_on_rooftop["Tilt"] >= 60
-        ] = 32
-        raw_PV_installations_on_rooftop["Tilt"][
-            raw_PV_installations_on_rooftop["Tilt"] == 0
-        ] = 32
+        tilts = raw_PV_installations_on_rooftop["Tilt"].to_numpy(dtype=np.float64)
+        raw_PV_installations_on_rooftop["Tilt"] = np.where(
+            (tilts >= 60) | (tilts == 0), 32.0, tilts
+        )
 
         return raw_PV_installations_on_rooftop
 
@@ -702,12 +944,11 @@ class RegistryCreator:
         )
 
         # Calculate corrected area by considering a rooftop's tilt
-        raw_PV_installations_on_rooftop["area_tilted"] = (
-            1
-            / raw_PV_installations_on_rooftop["Tilt"]
-            .apply(math.radians)
-            .apply(math.cos)
-        ) * raw_PV_installations_on_rooftop["area_inter"]
+        tilts = raw_PV_installations_on_rooftop["Tilt"].to_numpy(dtype=np.float64)
+        areas = raw_PV_installations_on_rooftop["area_inter"].to_numpy(dtype=np.float64)
+        raw_PV_installations_on_rooftop["area_tilted"] = areas / np.cos(
+            np.deg2rad(tilts)
+        )
 
         return raw_PV_installations_on_rooftop
 
@@ -729,29 +970,51 @@ class RegistryCreator:
             list of all geocoded street addresses
         """
 
-        coordinates = []
-        counter = 0
-        for i in range(len(addresses)):
+        if bing_key is not None:
+            requests_per_second = BING_GEOCODING_REQUESTS_PER_SECOND
+            max_workers = BING_GEOCODING_MAX_WORKERS
+
+        else:
+            requests_per_second = OSM_GEOCODING_REQUESTS_PER_SECOND
+            max_workers = OSM_GEOCODING_MAX_WORKERS
+
+        # Connection pool shared by all geocoding requests
+        session = requests.Session()
+
+        rate_limit_lock = threading.Lock()
+        next_request_time = time.monotonic()
+
+        def geocode_address(counter: int, address: str):
 
-            counter += 1
-            print(f"Geocode address {addresses[i]} at {counter}/{len(addresses)}")
-            # Apply some sleep to ensure to be below 50 requests per second
-            time.sleep(0.1)
-            address = addresses[i]
+            nonlocal next_request_time
+
+            print(f"Geocode address {address} at {counter}/{len(addresses)}")
+
+            # Space out the requests of all threads to stay below the request rate allowed by the geocoding service.
+            # The lock is held while waiting, so consecutive requests are never sent less than one interval apart
+            with rate_limit_lock:
+                time.sleep(max(0, next_request_time - time.monotonic()))
+                next_request_time = time.monotonic() + 1 / requests_per_second
 
             if bing_key is not None:
-                g = geocoder.bing(address, key=bing_key)
+                g = geocoder.bing(address, key=bing_key, session=session)
 
             else:
-                g = geocoder.osm(address)
+                g = geocoder.osm(address, session=session)
 
             if g.status == "OK":
-                coords = g.latlng
-                coordinates.append(coords)
+                return g.latlng
 
             else:
                 print("status: {}".format(g.status))
-                coordinates.append(",")
+                return ","
+
+        # Geocoding is bound by network latency, hence requests are sent concurrently if the geocoding service allows
+        # it. The coordinates are returned in the order of the addresses
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            coordinates = list(
+                executor.map(geocode_address, range(1, len(addresses) + 1), addresses)
+            )
 
         return coordinates
 